@@ -1,12 +1,264 @@
 import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
 import logging
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 
-import arxiv
-from openai import OpenAI
+import httpx
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI
 
-from database import init_db, insert_if_new, prune_old_papers
+from database import (
+    connect_db,
+    evict_llm_cache,
+    get_cached_response,
+    get_meta,
+    get_paper_summaries,
+    get_pending_papers,
+    init_db,
+    insert_run,
+    promote_papers,
+    prune_old_papers,
+    put_cached_response,
+    put_paper_summaries,
+    set_meta,
+    set_pending_status,
+    stage_new_papers,
+)
+from relevance import build_keyword_matcher, keyword_hits, score_papers
+
+WATERMARK_KEY = "watermark_published_utc"
+PENDING_BATCHES_KEY = "openai_pending_batches"
+BATCH_DONE_STATUSES = ("completed", "failed", "expired", "cancelled")
+ARXIV_QUERY = "(cat:cond-mat.supr-con OR cat:cond-mat.mes-hall)"
+ARXIV_QUERIES_FILE = Path(__file__).with_name("arxiv_queries.json")
+ATOM_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "opensearch": "http://a9.com/-/spec/opensearch/1.1/",
+}
+SYSTEM_PROMPT = "You write accurate technical summaries for condensed matter physics readers."
+# Single source of truth for the topic tags: the prompt, the JSON schema, the
+# relevance prefilter seeds and the keyword fast path are all derived from it.
+# "keywords" are case-insensitive regexes that are specific enough to assign
+# the tag without asking the model.
+TAG_CONFIG = {
+    "topology": {
+        "seed": (
+            "topological insulator superconductor semimetal edge states surface states "
+            "Chern number Berry phase Majorana zero modes topological invariant bulk-boundary"
+        ),
+        "keywords": [
+            r"topological (?:insulator|superconductor|semimetal)s?",
+            r"majorana (?:zero |bound )?(?:modes?|states?|fermions?)",
+            r"chern insulators?",
+            r"weyl semimetals?",
+        ],
+    },
+    "quantum_geometry": {
+        "seed": (
+            "quantum geometry quantum metric Berry curvature flat band superfluid weight "
+            "geometric contribution nonlinear Hall effect Wannier"
+        ),
+        "keywords": [r"quantum metric", r"quantum geometr(?:y|ic)"],
+    },
+    "machine_learning": {
+        "seed": (
+            "machine learning neural network deep learning training dataset prediction "
+            "Bayesian optimization generative model reinforcement learning"
+        ),
+        "keywords": [r"machine[- ]learning", r"neural[- ]networks?", r"deep learning"],
+    },
+    "quantum_computing": {
+        "seed": (
+            "qubit quantum computing superconducting qubit transmon coherence decoherence "
+            "quantum gate quantum processor error correction readout"
+        ),
+        "keywords": [r"\bqubits?\b", r"\btransmons?\b", r"quantum comput(?:er|ers|ing|ation)"],
+    },
+    "superconducting_impurity": {
+        "seed": (
+            "magnetic impurity superconductor Yu-Shiba-Rusinov YSR bound states subgap "
+            "Anderson impurity Kondo disorder pair breaking"
+        ),
+        "keywords": [r"yu[- ]shiba[- ]rusinov", r"\bYSR\b", r"shiba (?:states?|bands?|chains?|lattices?)"],
+    },
+    "pi_junction": {
+        "seed": (
+            "Josephson junction pi junction phase shift 0-pi transition ferromagnetic "
+            "supercurrent reversal current-phase relation phi0 diode effect"
+        ),
+        "keywords": [r"(?:\bpi|π)[- ]junctions?", r"0[- ](?:pi|π) transitions?"],
+    },
+    "vortex": {
+        "seed": (
+            "vortex vortices vortex lattice Abrikosov flux pinning vortex core "
+            "magnetic flux quantum fluxon vortex dynamics creep"
+        ),
+        "keywords": [r"\bvortex\b", r"\bvortices\b", r"abrikosov", r"\bfluxons?\b"],
+    },
+}
+TAGS = list(TAG_CONFIG)
+TAG_SEEDS = {tag: config["seed"] for tag, config in TAG_CONFIG.items()}
+TAG_KEYWORDS = {tag: config["keywords"] for tag, config in TAG_CONFIG.items()}
+KEYWORD_MATCHER = build_keyword_matcher(TAG_KEYWORDS)
+PRIORITIES = ["High", "Medium", "Low"]
+MAP_SCHEMA = {
+    "name": "paper_records",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["papers"],
+        "properties": {
+            "papers": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["index", "summary", "tags", "justification", "priority"],
+                    "properties": {
+                        "index": {"type": "integer"},
+                        "summary": {"type": "string"},
+                        "tags": {"type": "array", "items": {"type": "string", "enum": TAGS}},
+                        "justification": {"type": "string"},
+                        "priority": {"type": "string", "enum": PRIORITIES},
+                    },
+                },
+            },
+        },
+    },
+}
+MAP_SCHEMA_JSON = json.dumps(MAP_SCHEMA, sort_keys=True)
+REDUCE_SCHEMA = {
+    "name": "daily_overview",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["overview", "ranking"],
+        "properties": {
+            "overview": {"type": "string"},
+            "ranking": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["index", "reason"],
+                    "properties": {
+                        "index": {"type": "integer"},
+                        "reason": {"type": "string"},
+                    },
+                },
+            },
+        },
+    },
+}
+REDUCE_SCHEMA_JSON = json.dumps(REDUCE_SCHEMA, sort_keys=True)
+
+
+class ChatGPTError(Exception):
+    pass
+
+
+class EmptyResponseError(Exception):
+    pass
+
+
+def parse_duration_sec(value):
+    """Parse Retry-After style values: seconds, an HTTP date, or "1m30s"/"250ms"."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(n) * scale[u] for n, u in parts)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter and a retry budget shared by a whole run."""
+
+    def __init__(self, base_delay_sec, max_delay_sec, retry_budget, max_server_delay_sec):
+        self.base_delay_sec = base_delay_sec
+        self.max_delay_sec = max_delay_sec
+        self.retries_left = retry_budget
+        self.max_server_delay_sec = max_server_delay_sec
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_delay_sec=float(os.getenv("OPENAI_BACKOFF_BASE_SEC", "1")),
+            max_delay_sec=float(os.getenv("OPENAI_BACKOFF_MAX_SEC", "30")),
+            retry_budget=int(os.getenv("OPENAI_RETRY_BUDGET", "20")),
+            max_server_delay_sec=float(os.getenv("OPENAI_MAX_RETRY_AFTER_SEC", "300")),
+        )
+
+    def is_retryable(self, exc):
+        if isinstance(exc, (APITimeoutError, APIConnectionError, EmptyResponseError)):
+            return True
+        if isinstance(exc, APIStatusError):
+            return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+        return False
+
+    def try_spend(self):
+        if self.retries_left <= 0:
+            return False
+        self.retries_left -= 1
+        return True
+
+    def server_delay(self, exc):
+        response = getattr(exc, "response", None)
+        if response is None:
+            return None
+        headers = response.headers
+        if headers.get("retry-after-ms"):
+            delay = parse_duration_sec(headers["retry-after-ms"] + "ms")
+            if delay is not None:
+                return delay
+        if headers.get("retry-after"):
+            delay = parse_duration_sec(headers["retry-after"])
+            if delay is not None:
+                return delay
+        # The reset headers give the time until the quota is fully refilled,
+        # not a retry hint; only on a 429 do they say anything about waiting,
+        # and then no more than our own cap.
+        if getattr(exc, "status_code", None) == 429:
+            resets = [
+                parse_duration_sec(headers[name])
+                for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+                if headers.get(name)
+            ]
+            resets = [r for r in resets if r is not None]
+            if resets:
+                return min(min(resets), self.max_delay_sec)
+        return None
+
+    def delay(self, attempt, exc):
+        """Seconds to wait before the next attempt, or None to give up.
+
+        Only our own jittered schedule is capped at max_delay_sec; a server
+        wait is a floor, since retrying earlier just earns another 429. A
+        wait beyond max_server_delay_sec is not worth blocking the run on.
+        """
+        backoff = random.uniform(0, min(self.max_delay_sec, self.base_delay_sec * 2 ** (attempt - 1)))
+        server_delay = self.server_delay(exc)
+        if server_delay is None:
+            return backoff
+        if server_delay > self.max_server_delay_sec:
+            return None
+        return max(backoff, server_delay)
 
 
 def to_utc(dt):
@@ -27,176 +279,1194 @@ def setup_logging():
     )
 
 
-def split_chunks(items, size):
-    for i in range(0, len(items), size):
-        yield items[i:i + size]
+def estimate_tokens(text):
+    # ~4 characters per token for English prose; close enough for budgeting.
+    return len(text) // 4 + 1
+
 
+def normalize_ws(text):
+    return " ".join(text.split())
 
-def build_user_prompt(papers, run_time):
-    paper_blocks = []
+
+def format_paper_block(index, p):
+    # Terse record: a short local index instead of the arXiv ID, no URL or
+    # date, and whitespace-normalized text. Indices are mapped back on parse.
+    return f"[{index}] T: {normalize_ws(p['title'])}\nA: {normalize_ws(p['summary'])}"
+
+
+def assign_keyword_tags(papers, min_hits):
+    """Fast path: set p["known_tags"] from unambiguous keywords in one pass.
+
+    A tag counts as known when one of its keywords is in the title or shows up
+    at least min_hits times in the abstract; a single passing mention does not.
+    The tags are merged into the model's record afterwards rather than sent
+    with the prompt, so the fast path costs no input tokens.
+    """
     for p in papers:
-        paper_blocks.append(
-            "\n".join(
-                [
-                    f"ID: {p['arxiv_id']}",
-                    f"Title: {p['title']}",
-                    f"Published UTC: {p['published_utc']}",
-                    f"URL: {p['url']}",
-                    f"Summary: {p['summary']}",
-                ]
-            )
-        )
+        title_hits = keyword_hits(KEYWORD_MATCHER, p["title"])
+        abstract_hits = keyword_hits(KEYWORD_MATCHER, p["summary"])
+        p["known_tags"] = [
+            tag for tag in TAGS if title_hits[tag] or abstract_hits[tag] >= min_hits
+        ]
 
+
+def merge_known_tags(record, known_tags):
+    tags = [tag for tag in TAGS if tag in record["tags"] or tag in known_tags]
+    added = [tag for tag in known_tags if tag not in record["tags"]]
+    if added:
+        notes = "; ".join(f"{tag}: keyword match" for tag in added)
+        record["justification"] = "; ".join(filter(None, [record["justification"], notes]))
+    record["tags"] = tags
+
+
+def pack_chunks(papers, input_token_budget, output_tokens_per_paper, max_output_tokens):
+    """Greedily pack papers into chunks that fit the input and output token budgets.
+
+    A paper that alone exceeds the budget still gets a chunk of its own.
+    """
+    base_tokens = estimate_tokens(MAP_SYSTEM_PROMPT)
+    max_papers = max(1, max_output_tokens // output_tokens_per_paper)
+
+    chunk = []
+    chunk_tokens = base_tokens
+    for p in papers:
+        paper_tokens = estimate_tokens(format_paper_block(len(chunk) + 1, p))
+        if chunk and (
+            chunk_tokens + paper_tokens > input_token_budget or len(chunk) >= max_papers
+        ):
+            yield chunk
+            chunk = []
+            chunk_tokens = base_tokens
+        chunk.append(p)
+        chunk_tokens += paper_tokens
+    if chunk:
+        yield chunk
+
+
+def build_map_system_prompt():
+    tag_list = ", ".join(TAGS)
     return (
-        f"Run time (UTC): {run_time.isoformat()}\n"
-        "You are given newly detected arXiv papers (title and abstract only).\n\n"
+        f"{SYSTEM_PROMPT}\n\n"
+        "You are given newly detected arXiv papers as records: [index] T: title, "
+        "A: abstract.\n\n"
         "For EACH paper:\n"
         "1) Provide a 1-2 sentence objective summary.\n"
-        "2) Assign topic tags from the following list (only if clearly supported by the abstract):\n"
-        "   - topology\n"
-        "   - quantum_geometry\n"
-        "   - machine_learning\n"
-        "   - quantum_computing\n"
-        "   - superconducting_impurity\n"
-        "   - pi_junction\n"
-        "   - vortex\n"
-        "3) For each assigned tag, briefly justify in one short phrase.\n\n"
+        f"2) Assign topic tags from: {tag_list} (only if clearly supported by the abstract).\n"
+        "3) For each assigned tag, briefly justify in one short phrase.\n"
+        "4) Provide suggested reading priority (High/Medium/Low).\n\n"
         "Rules:\n"
         "- Use ONLY information from the title and abstract.\n"
         "- Do NOT speculate.\n"
-        "- If evidence is weak, do not assign the tag.\n\n"
-        "Then:\n"
-        "4) Provide a short thematic overview summarizing recurring topics.\n"
-        "5) Provide suggested reading priority (High/Medium/Low) with one-line reason.\n\n"
-        "Papers:\n\n" + "\n\n---\n\n".join(paper_blocks)
+        "- If evidence is weak, do not assign the tag.\n"
+        "- Return exactly one record per paper, using its [index] as index."
     )
 
 
-def call_chatgpt_with_retry(client, model, run_time, papers, timeout_sec, max_attempts):
-    user_prompt = build_user_prompt(papers, run_time)
+MAP_SYSTEM_PROMPT = build_map_system_prompt()
+
+
+def build_user_prompt(papers):
+    return "\n\n".join(format_paper_block(i, p) for i, p in enumerate(papers, start=1))
+
+
+def build_reduce_system_prompt(ranking_size):
+    return (
+        f"{SYSTEM_PROMPT}\n\n"
+        "You are given compact records for today's new arXiv papers, one per line:\n"
+        "[index] title | tags | priority | summary\n\n"
+        "1) Provide a short thematic overview summarizing recurring topics across ALL papers.\n"
+        f"2) Rank up to {ranking_size} papers most worth reading first, by index, "
+        "each with a one-line reason.\n\n"
+        "Rules:\n"
+        "- Use ONLY information from the records.\n"
+        "- Do NOT speculate."
+    )
+
+
+def build_reduce_prompt(papers, records):
+    lines = []
+    for i, p in enumerate(papers, start=1):
+        record = records[p["arxiv_id"]]
+        tags = ",".join(record["tags"]) or "-"
+        lines.append(
+            f"[{i}] {normalize_ws(p['title'])} | {tags} | {record.get('priority') or '-'} | {record['summary']}"
+        )
+    return "\n".join(lines)
+
+
+def paper_summary_hash(paper, model):
+    # A cached record is only valid for the model and tag set that produced it.
+    key = "\0".join([paper["title"], paper["summary"], model, ",".join(sorted(TAGS))])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def parse_map_response(text, papers):
+    """Validate a structured chunk response for the papers it was asked about.
+
+    Returns {arxiv_id: record}, mapping local indices back to arXiv IDs.
+    Records that are malformed or carry an unknown index are dropped so the
+    caller can re-request them; a response that is not valid JSON raises
+    ValueError.
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get("papers"), list):
+        raise ValueError("response does not match paper_records schema")
+
+    records = {}
+    for item in data["papers"]:
+        index = item.get("index") if isinstance(item, dict) else None
+        if not isinstance(index, int) or not 1 <= index <= len(papers):
+            continue
+        summary = item.get("summary")
+        tags = item.get("tags")
+        if not isinstance(summary, str) or not summary.strip():
+            continue
+        if not isinstance(tags, list) or not all(t in TAGS for t in tags):
+            continue
+        if item.get("priority") not in PRIORITIES:
+            continue
+        records[papers[index - 1]["arxiv_id"]] = {
+            "summary": summary.strip(),
+            "tags": tags,
+            "justification": str(item.get("justification", "")).strip(),
+            "priority": item["priority"],
+        }
+
+    return records
+
+
+def parse_reduce_response(text, papers):
+    """Validate the reduce response; returns (overview, [(arxiv_id, reason), ...])."""
+    data = json.loads(text)
+    if (
+        not isinstance(data, dict)
+        or not isinstance(data.get("overview"), str)
+        or not isinstance(data.get("ranking"), list)
+    ):
+        raise ValueError("response does not match daily_overview schema")
+
+    ranking = []
+    seen = set()
+    for item in data["ranking"]:
+        if not isinstance(item, dict) or not isinstance(item.get("reason"), str):
+            continue
+        index = item.get("index")
+        if isinstance(index, int) and 1 <= index <= len(papers) and index not in seen:
+            seen.add(index)
+            ranking.append((papers[index - 1]["arxiv_id"], item["reason"].strip()))
+    return data["overview"].strip(), ranking
+
+
+def render_paper_record(paper, record=None, error=None):
+    lines = [f"### {paper['title']}", f"{paper['url']}"]
+    if record is None:
+        lines.append(f"[Summary unavailable: {error}]")
+        return "\n".join(lines)
+    lines.append(f"Summary: {record['summary']}")
+    lines.append(f"Tags: {', '.join(record['tags']) or 'none'}")
+    if record["justification"]:
+        lines.append(f"Justification: {record['justification']}")
+    if record.get("priority"):
+        lines.append(f"Priority: {record['priority']}")
+    return "\n".join(lines)
+
+
+def prompt_cache_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RateLimiter:
+    """Client-side requests/tokens-per-minute token buckets shared by all LLM calls.
+
+    A limit of 0 disables that bucket. Buckets may go into debt when a single
+    request costs more than is available, which delays the calls after it.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.limits = (requests_per_minute, tokens_per_minute)
+        self._levels = [float(limit) for limit in self.limits]
+        self._updated = time.monotonic()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            requests_per_minute=int(os.getenv("OPENAI_RPM_LIMIT", "0")),
+            tokens_per_minute=int(os.getenv("OPENAI_TPM_LIMIT", "0")),
+        )
+
+    async def acquire(self, tokens):
+        costs = (1, tokens)
+        while True:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait_sec = 0.0
+            for i, limit in enumerate(self.limits):
+                if not limit:
+                    continue
+                self._levels[i] = min(limit, self._levels[i] + elapsed * limit / 60)
+                shortfall = min(costs[i], limit) - self._levels[i]
+                if shortfall > 0:
+                    wait_sec = max(wait_sec, shortfall * 60 / limit)
+            if wait_sec == 0:
+                for i, limit in enumerate(self.limits):
+                    if limit:
+                        self._levels[i] -= costs[i]
+                return
+            await asyncio.sleep(wait_sec)
+
+
+def build_chat_request(model, system_prompt, user_prompt, response_format=None):
+    # Everything ahead of the user message (schema, system instructions) is
+    # static across chunks and runs and the per-chunk paper records always
+    # come last. Provider prompt caching only starts at a 1024-token prefix,
+    # and today's system prompt plus schema is roughly 350 tokens, so expect
+    # cached_tokens=0; the usage logging is there to measure it if the
+    # instructions grow. The routing key costs nothing in the meantime.
+    request = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "prompt_cache_key": "arxiv-daily-" + hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16],
+    }
+    # GPT-5 family currently only supports the default temperature.
+    if not model.startswith("gpt-5"):
+        request["temperature"] = 0.2
+    if response_format is not None:
+        request["response_format"] = response_format
+    return request
+
+
+class RunMetrics:
+    """Per-run collection of LLM call metrics."""
+
+    def __init__(self):
+        self.calls = []
+
+    def record_call(
+        self, model, prompt_tokens, cached_tokens, completion_tokens, latency_sec, attempts, ok
+    ):
+        self.calls.append(
+            {
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "cached_tokens": cached_tokens,
+                "completion_tokens": completion_tokens,
+                "latency_sec": latency_sec,
+                "attempts": attempts,
+                "ok": ok,
+            }
+        )
+
+    def totals(self):
+        calls = self.calls
+        return {
+            "llm_calls": len(calls),
+            "llm_failed_calls": sum(1 for c in calls if not c["ok"]),
+            "llm_attempts": sum(c["attempts"] for c in calls),
+            "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+            "cached_tokens": sum(c["cached_tokens"] for c in calls),
+            "completion_tokens": sum(c["completion_tokens"] for c in calls),
+            "llm_latency_sec": round(sum(c["latency_sec"] or 0 for c in calls), 3),
+        }
+
+
+def cached_prompt_tokens(usage):
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details else 0
+
+
+def log_usage(usage):
+    if usage is None:
+        return
+    cached = cached_prompt_tokens(usage)
+    logging.info(
+        "ChatGPT usage prompt_tokens=%s cached_tokens=%s (%.0f%%) completion_tokens=%s",
+        usage.prompt_tokens,
+        cached,
+        100 * cached / usage.prompt_tokens if usage.prompt_tokens else 0,
+        usage.completion_tokens,
+    )
+
+
+async def call_chatgpt_with_retry(
+    client,
+    model,
+    system_prompt,
+    user_prompt,
+    timeout_sec,
+    max_attempts,
+    retry_policy,
+    rate_limiter,
+    metrics,
+    response_format=None,
+):
     last_error = None
+    prompt_tokens = estimate_tokens(system_prompt + user_prompt)
+    started = time.monotonic()
+    usage_totals = [0, 0, 0]
 
     for attempt in range(1, max_attempts + 1):
         try:
             logging.info(
-                "ChatGPT request attempt=%s papers=%s timeout=%ss",
+                "ChatGPT request attempt=%s prompt_chars=%s timeout=%ss",
                 attempt,
-                len(papers),
+                len(user_prompt),
                 timeout_sec,
             )
-            request_kwargs = {
-                "model": model,
-                "timeout": timeout_sec,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You write accurate technical summaries for condensed matter physics readers.",
-                    },
-                    {"role": "user", "content": user_prompt},
-                ],
-            }
-            # GPT-5 family currently only supports the default temperature.
-            if not model.startswith("gpt-5"):
-                request_kwargs["temperature"] = 0.2
-
-            resp = client.chat.completions.create(**request_kwargs)
+            request_kwargs = build_chat_request(model, system_prompt, user_prompt, response_format)
+            request_kwargs["timeout"] = timeout_sec
+            await rate_limiter.acquire(prompt_tokens)
+            resp = await client.chat.completions.create(**request_kwargs)
+            log_usage(resp.usage)
+            if resp.usage is not None:
+                usage_totals[0] += resp.usage.prompt_tokens
+                usage_totals[1] += cached_prompt_tokens(resp.usage)
+                usage_totals[2] += resp.usage.completion_tokens
             content = resp.choices[0].message.content
-            if content:
-                return content.strip()
-            last_error = "empty response"
+            if not content:
+                raise EmptyResponseError("empty response")
+            metrics.record_call(
+                model, *usage_totals, round(time.monotonic() - started, 3), attempt, True
+            )
+            return content.strip()
         except Exception as exc:
             last_error = str(exc)
             logging.warning("ChatGPT attempt failed: %s", exc)
+            if not retry_policy.is_retryable(exc):
+                break
+            if attempt == max_attempts:
+                break
+            delay = retry_policy.delay(attempt, exc)
+            if delay is None:
+                logging.warning("Server asked for a wait beyond OPENAI_MAX_RETRY_AFTER_SEC; giving up")
+                break
+            if not retry_policy.try_spend():
+                logging.warning("Run retry budget exhausted; giving up on this request")
+                break
+            logging.info("Retrying in %.1fs", delay)
+            await asyncio.sleep(delay)
+
+    metrics.record_call(
+        model, *usage_totals, round(time.monotonic() - started, 3), attempt, False
+    )
+    raise ChatGPTError(last_error)
 
-    return f"[Report generation failed after retries: {last_error}]"
 
+async def call_openai_with_retry(description, call, max_attempts, retry_policy):
+    """Await call() (a Files/Batches API request) under the run's RetryPolicy.
 
-def generate_report_with_chatgpt(papers, run_time):
+    The client is built with max_retries=0, so these requests get the same
+    backoff and shared retry budget as chat completions. The last error is
+    re-raised for the caller to handle.
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return await call()
+        except Exception as exc:
+            logging.warning("%s attempt=%s failed: %s", description, attempt, exc)
+            if not retry_policy.is_retryable(exc) or attempt == max_attempts:
+                raise
+            delay = retry_policy.delay(attempt, exc)
+            if delay is None or not retry_policy.try_spend():
+                raise
+            logging.info("Retrying in %.1fs", delay)
+            await asyncio.sleep(delay)
+
+
+def get_pending_batches(conn):
+    """Batch API jobs submitted by earlier runs: [{"id", "chunks": {custom_id: papers}}]."""
+    return json.loads(get_meta(conn, PENDING_BATCHES_KEY) or "[]")
+
+
+def set_pending_batches(conn, batches):
+    set_meta(conn, PENDING_BATCHES_KEY, json.dumps(batches))
+
+
+async def submit_openai_batch(client, conn, requests, chunk_papers, max_attempts, retry_policy):
+    """Upload {custom_id: chat request} as a Batch API job and remember it in meta.
+
+    chunk_papers maps each custom_id to the [arxiv_id, summary_hash,
+    known_tags] of the papers in that request, in prompt order, so a later
+    run can turn the answers into paper_summaries rows however its own
+    chunks are cut.
+    """
+    # Built in memory so a retried upload re-sends the whole file.
+    content = "".join(
+        json.dumps({"custom_id": key, "method": "POST", "url": "/v1/chat/completions", "body": body}) + "\n"
+        for key, body in requests.items()
+    ).encode("utf-8")
+    input_file = await call_openai_with_retry(
+        "OpenAI batch file upload",
+        lambda: client.files.create(file=("chat_requests.jsonl", content), purpose="batch"),
+        max_attempts,
+        retry_policy,
+    )
+    batch = await call_openai_with_retry(
+        "OpenAI batch create",
+        lambda: client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        ),
+        max_attempts,
+        retry_policy,
+    )
+    set_pending_batches(conn, get_pending_batches(conn) + [{"id": batch.id, "chunks": chunk_papers}])
+    conn.commit()
+    logging.info("Submitted OpenAI batch id=%s requests=%s", batch.id, len(requests))
+    return batch.id
+
+
+async def store_batch_output(
+    client, conn, batch, output_file_id, model, now_iso, metrics, max_attempts, retry_policy
+):
+    """Parse a finished batch's output into paper_summaries; returns the papers stored."""
+    stored = 0
+    output = await call_openai_with_retry(
+        f"OpenAI batch output download id={batch['id']}",
+        lambda: client.files.content(output_file_id),
+        max_attempts,
+        retry_policy,
+    )
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        chunk = batch["chunks"].get(item.get("custom_id"))
+        response = item.get("response") or {}
+        ok = response.get("status_code") == 200
+        usage = (response.get("body") or {}).get("usage") or {}
+        metrics.record_call(
+            model,
+            usage.get("prompt_tokens", 0),
+            (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+            usage.get("completion_tokens", 0),
+            None,
+            1,
+            ok,
+        )
+        if not ok or chunk is None:
+            continue
+        content = response["body"]["choices"][0]["message"]["content"]
+        try:
+            papers = [{"arxiv_id": arxiv_id} for arxiv_id, _, _ in chunk]
+            found = parse_map_response(content or "", papers)
+        except ValueError:
+            continue
+        for arxiv_id, _, known_tags in chunk:
+            if arxiv_id in found:
+                merge_known_tags(found[arxiv_id], known_tags)
+        hashes = {arxiv_id: summary_hash for arxiv_id, summary_hash, _ in chunk}
+        put_paper_summaries(
+            conn, [(arxiv_id, hashes[arxiv_id], rec) for arxiv_id, rec in found.items()], model, now_iso
+        )
+        set_pending_status(conn, found, "summarized")
+        stored += len(found)
+    return stored
+
+
+async def collect_openai_batches(
+    client, conn, model, wait_sec, poll_sec, now_iso, metrics, max_attempts, retry_policy
+):
+    """Store the answers of every finished pending batch; returns arxiv_ids still in flight.
+
+    Waits at most wait_sec in total, across all pending batches, for running
+    ones to finish. Expired and cancelled batches still carry the output of
+    the requests they completed, so that is read too; papers without an
+    answer are simply submitted again. A batch whose status or output
+    cannot be fetched stays in meta for the next run.
+    """
+    batches = get_pending_batches(conn)
+    if not batches:
+        return set()
+
+    deadline = time.monotonic() + wait_sec
+    while True:
+        statuses = {}
+        for batch in batches:
+            try:
+                statuses[batch["id"]] = await call_openai_with_retry(
+                    f"OpenAI batch status id={batch['id']}",
+                    lambda: client.batches.retrieve(batch["id"]),
+                    max_attempts,
+                    retry_policy,
+                )
+            except Exception as exc:
+                logging.warning("Could not check OpenAI batch id=%s: %s", batch["id"], exc)
+        running = [
+            b for b in batches
+            if b["id"] not in statuses or statuses[b["id"]].status not in BATCH_DONE_STATUSES
+        ]
+        if not running or time.monotonic() + poll_sec > deadline:
+            break
+        await asyncio.sleep(poll_sec)
+
+    still_pending = []
+    for batch in batches:
+        if batch in running:
+            logging.info(
+                "OpenAI batch id=%s still %s; leaving it for a later run",
+                batch["id"],
+                statuses[batch["id"]].status if batch["id"] in statuses else "unknown",
+            )
+            still_pending.append(batch)
+            continue
+        info = statuses[batch["id"]]
+        stored = 0
+        if info.output_file_id:
+            try:
+                stored = await store_batch_output(
+                    client, conn, batch, info.output_file_id, model, now_iso, metrics,
+                    max_attempts, retry_policy,
+                )
+            except Exception as exc:
+                logging.warning(
+                    "Could not read output of OpenAI batch id=%s; leaving it for a later run: %s",
+                    batch["id"],
+                    exc,
+                )
+                still_pending.append(batch)
+                continue
+        logging.info("OpenAI batch id=%s status=%s stored=%s", batch["id"], info.status, stored)
+
+    set_pending_batches(conn, still_pending)
+    conn.commit()
+    return {
+        arxiv_id for b in still_pending for chunk in b["chunks"].values() for arxiv_id, _, _ in chunk
+    }
+
+
+def render_title_only(paper):
+    return f"- [{paper['title']}]({paper['url']})"
+
+
+async def reduce_report(conn, summarize, model, papers, records, ranking_size, now_iso):
+    """Run the reduce call and return the Overview / Reading priority sections."""
+    system_prompt = build_reduce_system_prompt(ranking_size)
+    prompt = build_reduce_prompt(papers, records)
+    key = prompt_cache_key(model, system_prompt, REDUCE_SCHEMA_JSON, prompt)
+    text = get_cached_response(conn, key, now_iso)
+    cache_hit = text is not None
+    try:
+        if not cache_hit:
+            text = await summarize(
+                system_prompt, prompt, {"type": "json_schema", "json_schema": REDUCE_SCHEMA}
+            )
+        overview, ranking = parse_reduce_response(text, papers)
+    except (ChatGPTError, ValueError) as exc:
+        logging.warning("Reduce step failed: %s", exc)
+        return [f"## Overview\n\n[Overview unavailable: {exc}]"]
+
+    if not cache_hit:
+        put_cached_response(conn, key, model, text, now_iso)
+        conn.commit()
+
+    by_id = {p["arxiv_id"]: p for p in papers}
+    sections = [f"## Overview\n\n{overview}"]
+    if ranking:
+        lines = [
+            f"{rank}. [{by_id[arxiv_id]['title']}]({by_id[arxiv_id]['url']}) - {reason}"
+            for rank, (arxiv_id, reason) in enumerate(ranking, start=1)
+        ]
+        sections.append("## Reading priority\n\n" + "\n".join(lines))
+    return sections
+
+
+async def generate_report_with_chatgpt(conn, papers, run_time, metrics, deadline):
+    """Build the report text; returns (report_text, arxiv_ids actually reported).
+
+    Papers whose summary failed, or that are waiting on a Batch API job, are
+    left out of the returned set so a later run picks them up again.
+    deadline (time.monotonic()) bounds how long batch collection may wait.
+    """
     if not papers:
-        return "# Arxiv Daily Report\n\nNo new papers were found in this run."
+        return "# Arxiv Daily Report\n\nNo new papers were found in this run.", set()
 
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         return (
             "# Arxiv Daily Report\n\n"
             "Found new papers, but skipped ChatGPT summary because OPENAI_API_KEY is not set."
-        )
+        ), set()
 
     model = os.getenv("OPENAI_MODEL", "gpt-5-mini")
-    client = OpenAI(api_key=api_key)
+    retry_policy = RetryPolicy.from_env()
+    rate_limiter = RateLimiter.from_env()
     timeout_sec = int(os.getenv("OPENAI_TIMEOUT_SEC", "60"))
     max_attempts = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
-    chunk_size = int(os.getenv("REPORT_CHUNK_SIZE", "10"))
+    input_token_budget = int(os.getenv("REPORT_INPUT_TOKEN_BUDGET", "12000"))
+    output_tokens_per_paper = int(os.getenv("REPORT_OUTPUT_TOKENS_PER_PAPER", "150"))
+    max_output_tokens = int(os.getenv("REPORT_MAX_OUTPUT_TOKENS", "4000"))
+    max_concurrency = int(os.getenv("REPORT_MAX_CONCURRENCY", "4"))
+    cache_ttl = timedelta(days=float(os.getenv("LLM_CACHE_TTL_DAYS", "30")))
+    cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+    ranking_size = int(os.getenv("REPORT_RANKING_SIZE", "15"))
+    relevance_threshold = float(os.getenv("REPORT_RELEVANCE_THRESHOLD", "0.08"))
+    batch_mode = os.getenv("REPORT_LLM_BACKEND", "sync") == "batch"
+    now_iso = run_time.isoformat()
+
+    # Cheap local TF-IDF scoring against the tag seeds: papers that match no
+    # tag are listed by title only and never reach the model.
+    scores = score_papers(papers, TAG_SEEDS)
+    # Papers with a keyword-assigned tag (title hit or repeated abstract hits)
+    # are relevant by definition.
+    def is_relevant(p):
+        return bool(p.get("known_tags")) or scores[p["arxiv_id"]][0] >= relevance_threshold
+
+    low_relevance = [p for p in papers if not is_relevant(p)]
+    papers = [p for p in papers if is_relevant(p)]
+    logging.info(
+        "Relevance prefilter threshold=%s kept=%s skipped=%s",
+        relevance_threshold,
+        len(papers),
+        len(low_relevance),
+    )
+
+    evict_llm_cache(conn, (run_time - cache_ttl).isoformat(), cache_max_entries)
+    conn.commit()
 
-    section_texts = []
-    for idx, chunk in enumerate(split_chunks(papers, chunk_size), start=1):
-        section = call_chatgpt_with_retry(
-            client=client,
-            model=model,
-            run_time=run_time,
-            papers=chunk,
-            timeout_sec=timeout_sec,
-            max_attempts=max_attempts,
+    response_format = {"type": "json_schema", "json_schema": MAP_SCHEMA}
+    chunks = []
+    failures = {}
+    awaiting_batch = []
+    batch_error = None
+
+    # Retries are handled by RetryPolicy, not by the SDK's own retry loop.
+    client = AsyncOpenAI(api_key=api_key, max_retries=0)
+    tasks = {}
+    try:
+        # Answers from Batch API jobs submitted by earlier runs go straight
+        # into paper_summaries, so they show up as cache hits below.
+        wait_sec = min(
+            float(os.getenv("OPENAI_BATCH_WAIT_SEC", "0")), max(0.0, deadline - time.monotonic())
+        )
+        in_flight_ids = await collect_openai_batches(
+            client, conn, model, wait_sec, float(os.getenv("OPENAI_BATCH_POLL_SEC", "30")),
+            now_iso, metrics, max_attempts, retry_policy,
         )
-        section_texts.append(f"## Batch {idx}\n\n{section}")
 
-    return "# Arxiv Daily Report\n\n" + "\n\n".join(section_texts)
+        # Papers summarized by any earlier run are rendered from arxiv.db; only
+        # the rest are sent to the model.
+        summary_hashes = {p["arxiv_id"]: paper_summary_hash(p, model) for p in papers}
+        records = get_paper_summaries(conn, list(summary_hashes.items()))
+        cached_papers = [p for p in papers if p["arxiv_id"] in records]
+        uncached_papers = [p for p in papers if p["arxiv_id"] not in records]
+        logging.info("Paper summary cache hits=%s misses=%s", len(cached_papers), len(uncached_papers))
 
+        if batch_mode:
+            # Batch backend: submit and move on. The (cheaper, slower) Batch
+            # API answers within 24h and the next run collects the results,
+            # so papers wait one run for their summary instead of holding the
+            # job open.
+            awaiting_batch = [p for p in uncached_papers if p["arxiv_id"] in in_flight_ids]
+            to_submit = [p for p in uncached_papers if p["arxiv_id"] not in in_flight_ids]
+            requests, chunk_papers = {}, {}
+            for chunk in pack_chunks(
+                to_submit, input_token_budget, output_tokens_per_paper, max_output_tokens
+            ):
+                prompt = build_user_prompt(chunk)
+                key = prompt_cache_key(model, MAP_SYSTEM_PROMPT, MAP_SCHEMA_JSON, prompt)
+                requests[key] = build_chat_request(model, MAP_SYSTEM_PROMPT, prompt, response_format)
+                chunk_papers[key] = [
+                    [p["arxiv_id"], summary_hashes[p["arxiv_id"]], p.get("known_tags", [])]
+                    for p in chunk
+                ]
+            if requests:
+                try:
+                    await submit_openai_batch(
+                        client, conn, requests, chunk_papers, max_attempts, retry_policy
+                    )
+                except Exception as exc:
+                    # The papers stay pending and are submitted again next run.
+                    logging.warning("OpenAI batch submission failed: %s", exc)
+                    batch_error = f"{len(to_submit)} relevant papers could not be submitted ({exc})"
+                else:
+                    set_pending_status(conn, [p["arxiv_id"] for p in to_submit], "batched")
+                    conn.commit()
+                    awaiting_batch.extend(to_submit)
+        else:
+            chunks = list(
+                pack_chunks(uncached_papers, input_token_budget, output_tokens_per_paper, max_output_tokens)
+            )
 
-def main():
-    setup_logging()
+        in_flight = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def summarize(system_prompt, prompt, response_format=response_format):
+            async with in_flight:
+                return await call_chatgpt_with_retry(
+                    client=client,
+                    model=model,
+                    system_prompt=system_prompt,
+                    user_prompt=prompt,
+                    timeout_sec=timeout_sec,
+                    max_attempts=max_attempts,
+                    retry_policy=retry_policy,
+                    rate_limiter=rate_limiter,
+                    metrics=metrics,
+                    response_format=response_format,
+                )
+
+        # Map: chunks are independent requests, so run them as concurrent tasks with
+        # a bounded number in flight. Prompts answered by an earlier run are served
+        # from llm_cache; every new answer is stored as soon as it arrives so a
+        # later timeout does not throw it away.
+        logging.info("Summarizing %s chunks with concurrency=%s", len(chunks), max_concurrency)
+        loop = asyncio.get_running_loop()
+
+        def submit(idx, batch):
+            prompt = build_user_prompt(batch)
+            key = prompt_cache_key(model, MAP_SYSTEM_PROMPT, MAP_SCHEMA_JSON, prompt)
+            cached = get_cached_response(conn, key, now_iso)
+            if cached is None:
+                task = asyncio.ensure_future(summarize(MAP_SYSTEM_PROMPT, prompt))
+            else:
+                task = loop.create_future()
+                task.set_result(cached)
+            tasks[task] = (idx, batch, key, cached is not None)
+
+        for idx, chunk in enumerate(chunks):
+            submit(idx, chunk)
+
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                idx, batch, key, cache_hit = tasks.pop(task)
+                try:
+                    text = task.result()
+                except ChatGPTError as exc:
+                    failures.update((p["arxiv_id"], f"failed after retries: {exc}") for p in batch)
+                    continue
+
+                try:
+                    found = parse_map_response(text, batch)
+                except ValueError as exc:
+                    logging.warning("Discarding malformed response for %s papers: %s", len(batch), exc)
+                    found = {}
+                else:
+                    if not cache_hit:
+                        put_cached_response(conn, key, model, text, now_iso)
+                for p in batch:
+                    if p["arxiv_id"] in found:
+                        merge_known_tags(found[p["arxiv_id"]], p.get("known_tags", []))
+
+                put_paper_summaries(
+                    conn,
+                    [(arxiv_id, summary_hashes[arxiv_id], rec) for arxiv_id, rec in found.items()],
+                    model,
+                    now_iso,
+                )
+                set_pending_status(conn, found, "summarized")
+                conn.commit()
+                records.update(found)
+
+                # Re-request only the papers the model dropped or got wrong.
+                missing = [p for p in batch if p["arxiv_id"] not in found]
+                for p in missing:
+                    if len(batch) > 1:
+                        submit(None, [p])
+                    else:
+                        failures[p["arxiv_id"]] = "no valid record in response"
+                if missing and len(batch) > 1:
+                    logging.warning("Re-requesting %s of %s papers individually", len(missing), len(batch))
+
+        # Reduce: one call over the compact records of every summarized paper
+        # (new or cached) yields a single overview and a global reading order.
+        section_texts = []
+        summarized = [p for p in papers if p["arxiv_id"] in records]
+        if summarized:
+            section_texts.extend(
+                await reduce_report(conn, summarize, model, summarized, records, ranking_size, now_iso)
+            )
+    finally:
+        for task in tasks:
+            task.cancel()
+        await client.close()
+
+    for idx, chunk in enumerate(chunks):
+        blocks = [
+            render_paper_record(p, records.get(p["arxiv_id"]), failures.get(p["arxiv_id"]))
+            for p in chunk
+        ]
+        section_texts.append(f"## Batch {idx + 1}\n\n" + "\n\n".join(blocks))
+    if cached_papers:
+        heading = "Previously summarized" if chunks else "Summaries"
+        section_texts.append(
+            f"## {heading}\n\n"
+            + "\n\n".join(render_paper_record(p, records[p["arxiv_id"]]) for p in cached_papers)
+        )
+    if awaiting_batch:
+        section_texts.append(
+            f"## Awaiting batch summaries\n\n{len(awaiting_batch)} relevant papers are being "
+            "summarized through the OpenAI Batch API and will appear in a later report."
+        )
+    if batch_error:
+        section_texts.append(
+            f"## Batch submission failed\n\n{batch_error}; they will be retried in the next run."
+        )
+
+    if low_relevance:
+        section_texts.append(
+            "## Other new papers\n\n" + "\n".join(render_title_only(p) for p in low_relevance)
+        )
+
+    reported_ids = {p["arxiv_id"] for p in papers if p["arxiv_id"] in records}
+    reported_ids.update(p["arxiv_id"] for p in low_relevance)
+    return "# Arxiv Daily Report\n\n" + "\n\n".join(section_texts), reported_ids
+
+
+class ArxivError(Exception):
+    pass
+
+
+class ArxivThrottle:
+    """Send arXiv API requests one at a time, min_interval_sec apart.
+
+    arXiv asks for a single connection and a pause between requests, so the
+    lock is held for the whole request and the pause is counted from when
+    the previous response arrived, not from when it was sent.
+    """
+
+    def __init__(self, min_interval_sec):
+        self.min_interval_sec = min_interval_sec
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, http, url, params):
+        async with self._lock:
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await http.get(url, params=params)
+            finally:
+                self._next_at = time.monotonic() + self.min_interval_sec
+
+
+def paper_from_entry(entry):
+    entry_id = entry.findtext("atom:id", "", ATOM_NS).strip()
+    tail = entry_id.split("/")[-1]  # 2502.12345v2
+    arxiv_id = tail.split("v")[0]  # 2502.12345
+    published = datetime.fromisoformat(entry.findtext("atom:published", "", ATOM_NS).strip())
+    return {
+        "arxiv_id": arxiv_id,
+        "title": normalize_ws(entry.findtext("atom:title", "", ATOM_NS)),
+        "published_utc": to_utc(published).isoformat(),
+        "url": entry_id,
+        "summary": (entry.findtext("atom:summary", "", ATOM_NS) or "").strip(),
+    }
+
+
+def parse_arxiv_feed(text):
+    """Parse one arXiv API Atom page into (total_results, papers)."""
+    root = ET.fromstring(text)
+    entries = root.findall("atom:entry", ATOM_NS)
+    # The API reports a bad query as a feed with a single error entry.
+    if len(entries) == 1 and "/api/errors" in entries[0].findtext("atom:id", "", ATOM_NS):
+        raise ArxivError(entries[0].findtext("atom:summary", "", ATOM_NS).strip())
+    total = int(root.findtext("opensearch:totalResults", "0", ATOM_NS))
+    return total, [paper_from_entry(e) for e in entries]
+
+
+async def fetch_arxiv_page(http, throttle, query, start, page_size, max_attempts):
+    params = {
+        "search_query": query,
+        "sortBy": "submittedDate",
+        "sortOrder": "descending",
+        "start": start,
+        "max_results": page_size,
+    }
+    url = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query")
+    for attempt in range(1, max_attempts + 1):
+        try:
+            resp = await throttle.get(http, url, params)
+            resp.raise_for_status()
+            total, papers = parse_arxiv_feed(resp.text)
+            # arXiv occasionally answers with an empty page mid-result-set.
+            if papers or start >= total:
+                return total, papers
+            logging.warning("Empty arXiv page start=%s total=%s attempt=%s", start, total, attempt)
+        except (httpx.HTTPError, ET.ParseError) as exc:
+            logging.warning("arXiv request failed start=%s attempt=%s: %s", start, attempt, exc)
+            if attempt == max_attempts:
+                raise
+    return total, []
+
+
+def load_queries(path, default_max_results):
+    """Read the arXiv query list: [{"name", "query", optional "max_results"}, ...].
+
+    Falls back to the single built-in query when the file does not exist.
+    """
+    path = Path(path)
+    if not path.exists():
+        logging.info("No query config at %s; using the default query", path)
+        return [{"name": "default", "query": ARXIV_QUERY, "max_results": default_max_results}]
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    queries = []
+    for spec in config["queries"]:
+        if not spec.get("name") or not spec.get("query"):
+            raise ValueError(f"query entries need a name and a query: {spec!r}")
+        queries.append({**spec, "max_results": int(spec.get("max_results", default_max_results))})
+    if len({q["name"] for q in queries}) != len(queries):
+        raise ValueError(f"duplicate query names in {path}")
+    return queries
+
+
+async def fetch_pages(http, throttle, spec, window_start, page_size, page_queue):
+    """Producer: push (query name, page) for in-window results onto page_queue.
+
+    A (name, None) sentinel marks the end of this query's results. Returns
+    (scanned_count, truncated, error); truncated means max_results ran out
+    before paging reached window_start, error describes a page that still
+    failed after ARXIV_NUM_RETRIES. Either way the pages already queued
+    are kept, so one bad query does not sink the others.
+    """
+    name, query, max_results = spec["name"], spec["query"], spec["max_results"]
+    scanned_count = 0
+    reached_window_start = False
+    max_attempts = int(os.getenv("ARXIV_NUM_RETRIES", "3"))
+    error = None
+    try:
+        while scanned_count < max_results and not reached_window_start:
+            total, results = await fetch_arxiv_page(
+                http, throttle, query, scanned_count, min(page_size, max_results - scanned_count),
+                max_attempts,
+            )
+            page = []
+            for p in results:
+                scanned_count += 1
+                if datetime.fromisoformat(p["published_utc"]) < window_start:
+                    reached_window_start = True
+                    break
+                page.append(p)
+            if page:
+                await page_queue.put((name, page))
+            if not results or scanned_count >= total:
+                break
+    except Exception as exc:
+        # httpx status errors append a second "for more information" line.
+        error = f"{type(exc).__name__}: {next(iter(str(exc).splitlines()), '')}"
+        logging.warning(
+            "Query %s failed after %s results; its older papers were not fetched: %s",
+            name,
+            scanned_count,
+            error,
+        )
+    finally:
+        await page_queue.put((name, None))
+
+    truncated = error is None and not reached_window_start and scanned_count >= max_results
+    if truncated:
+        logging.warning(
+            "Query %s hit max_results=%s before reaching window_start=%s; older papers were not fetched",
+            name,
+            max_results,
+            window_start.isoformat(),
+        )
+    return scanned_count, truncated, error
+
+
+async def ingest_window(conn, http, throttle, queries, window_start, page_size, max_pages_in_flight):
+    """Fetch every query concurrently while deduping the merged pages into the DB.
+
+    All producers share one throttle (arXiv's politeness limit is per client,
+    not per query) and one bounded queue, so fetching stays at most
+    max_pages_in_flight pages ahead of the SQLite writes. Papers matched by
+    several queries are dropped in memory before they reach the database.
+    Returns (scanned_count, in_window_count, new_papers, query_stats).
+    """
+    page_queue = asyncio.Queue(maxsize=max_pages_in_flight)
+    query_stats = {
+        q["name"]: {"scanned": 0, "in_window": 0, "unique": 0, "new": 0, "truncated": False, "error": None}
+        for q in queries
+    }
+    seen_ids = set()
+    new_papers = []
+
+    producers = [
+        asyncio.create_task(fetch_pages(http, throttle, q, window_start, page_size, page_queue))
+        for q in queries
+    ]
+    try:
+        running = len(producers)
+        while running:
+            name, page = await page_queue.get()
+            if page is None:
+                running -= 1
+                continue
+            stats = query_stats[name]
+            stats["in_window"] += len(page)
+            unique = []
+            for p in page:
+                if p["arxiv_id"] not in seen_ids:
+                    seen_ids.add(p["arxiv_id"])
+                    unique.append(p)
+            stats["unique"] += len(unique)
+            new_ids = stage_new_papers(conn, unique) if unique else set()
+            stats["new"] += len(new_ids)
+            new_papers.extend(p for p in unique if p["arxiv_id"] in new_ids)
+            logging.info(
+                "Ingested page query=%s size=%s unique=%s new=%s",
+                name,
+                len(page),
+                len(unique),
+                len(new_ids),
+            )
+        results = await asyncio.gather(*producers)
+    except BaseException:
+        for producer in producers:
+            producer.cancel()
+        raise
+
+    for q, (scanned, truncated, error) in zip(queries, results):
+        stats = query_stats[q["name"]]
+        stats["scanned"] = scanned
+        stats["truncated"] = truncated
+        stats["error"] = error
+        logging.info(
+            "Query %s scanned=%s in_window=%s unique=%s new=%s truncated=%s failed=%s",
+            q["name"],
+            stats["scanned"],
+            stats["in_window"],
+            stats["unique"],
+            stats["new"],
+            truncated,
+            error is not None,
+        )
+    return sum(stats["scanned"] for stats in query_stats.values()), len(seen_ids), new_papers, query_stats
+
+
+async def run_report(conn):
     now = datetime.now(timezone.utc)
+    started = time.monotonic()
+    metrics = RunMetrics()
     window_start = now - timedelta(days=5)
     logging.info("Run started. window_start=%s", window_start.isoformat())
 
-    init_db()
+    init_db(conn)
 
-    search = arxiv.Search(
-        query="(cat:cond-mat.supr-con OR cat:cond-mat.mes-hall)",
-        sort_by=arxiv.SortCriterion.SubmittedDate,
-        sort_order=arxiv.SortOrder.Descending,
-        max_results=200,
-    )
+    # Stop paging once we are back in already-ingested territory. The overlap
+    # re-checks the newest known stretch in case arXiv announces late submissions.
+    watermark = get_meta(conn, WATERMARK_KEY)
+    fetch_start = window_start
+    if watermark:
+        overlap = timedelta(hours=float(os.getenv("ARXIV_WATERMARK_OVERLAP_HOURS", "24")))
+        fetch_start = max(window_start, datetime.fromisoformat(watermark) - overlap)
+    logging.info("watermark=%s fetch_start=%s", watermark, fetch_start.isoformat())
 
-    new_papers = []
-    scanned_count = 0
-    in_window_count = 0
+    # Per-query hard ceiling only (a query may set its own): pages are
+    # requested lazily and paging stops at fetch_start, so quiet days still
+    # fetch just the pages they need.
+    max_results = int(os.getenv("ARXIV_MAX_RESULTS", "2000"))
+    queries = load_queries(os.getenv("ARXIV_QUERIES_FILE", ARXIV_QUERIES_FILE), max_results)
+    page_size = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+    max_pages_in_flight = int(os.getenv("ARXIV_QUEUE_PAGES", "2"))
+    throttle = ArxivThrottle(float(os.getenv("ARXIV_DELAY_SEC", "3")))
 
-    for r in search.results():
-        scanned_count += 1
-        published = to_utc(r.published)
-        if published < window_start:
-            break
-        in_window_count += 1
-
-        tail = r.entry_id.split("/")[-1]  # 2502.12345v2
-        arxiv_id = tail.split("v")[0]  # 2502.12345
-
-        summary = (r.summary or "").strip()
-        if insert_if_new(arxiv_id, r.title, summary, published.isoformat()):
-            new_papers.append(
-                {
-                    "arxiv_id": arxiv_id,
-                    "title": r.title,
-                    "published_utc": published.isoformat(),
-                    "url": r.entry_id,
-                    "summary": summary,
-                }
-            )
+    async with httpx.AsyncClient(
+        timeout=float(os.getenv("ARXIV_TIMEOUT_SEC", "30")),
+        headers={"User-Agent": "arxiv-daily-report"},
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=1),
+    ) as http:
+        scanned_count, in_window_count, new_papers, query_stats = await ingest_window(
+            conn, http, throttle, queries, fetch_start, page_size, max_pages_in_flight
+        )
+    # A truncated or failed query left a gap below its oldest fetched paper;
+    # moving the watermark past that gap would make every later run skip it
+    # for good.
+    truncated = [name for name, stats in query_stats.items() if stats["truncated"]]
+    failed = {name: stats["error"] for name, stats in query_stats.items() if stats["error"]}
+    if truncated:
+        logging.warning(
+            "Not advancing watermark: queries %s were truncated; raise ARXIV_MAX_RESULTS",
+            ", ".join(truncated),
+        )
+    if failed:
+        logging.warning("Not advancing watermark: queries %s failed", ", ".join(failed))
+    if not truncated and not failed and new_papers:
+        newest = max(p["published_utc"] for p in new_papers)
+        if not watermark or newest > watermark:
+            set_meta(conn, WATERMARK_KEY, newest)
+    conn.commit()
+
+    ingest_sec = time.monotonic() - started
 
-    report_text = generate_report_with_chatgpt(new_papers, now)
-    report_name = f"arxiv_daily_report_{now.strftime('%Y%m%d_%H%M%S')}.md"
+    # Everything not yet reported: this run's new papers plus any left behind
+    # by an earlier run that died or failed before its report was written.
+    papers_to_report = get_pending_papers(conn)
+    logging.info(
+        "Papers to report: new=%s resumed=%s",
+        len(new_papers),
+        len(papers_to_report) - len(new_papers),
+    )
+
+    assign_keyword_tags(papers_to_report, int(os.getenv("REPORT_KEYWORD_MIN_HITS", "2")))
+    # The workflow kills the job at timeout-minutes; anything that waits
+    # (batch collection) has to fit inside this budget.
+    deadline = started + float(os.getenv("REPORT_TIME_BUDGET_SEC", "900"))
+    report_text, reported_ids = await generate_report_with_chatgpt(
+        conn, papers_to_report, now, metrics, deadline
+    )
+    if failed:
+        report_text += "\n\n## arXiv fetch errors\n\n" + "\n".join(
+            f"- {name}: {error} (older papers will be fetched next run)" for name, error in failed.items()
+        )
+    run_id = now.strftime("%Y%m%d_%H%M%S")
+    report_name = f"arxiv_daily_report_{run_id}.md"
     with open(report_name, "w", encoding="utf-8") as f:
         f.write(report_text)
+        f.flush()
+        os.fsync(f.fileno())
+    # Only now that the report is durable do its papers count as seen; a run
+    # that dies earlier leaves them staged for the next one.
+    promote_papers(conn, reported_ids)
+    report_sec = time.monotonic() - started - ingest_sec
+
+    deleted_count = prune_old_papers(conn, window_start.isoformat())
 
-    deleted_count = prune_old_papers(window_start.isoformat())
+    run_summary = {
+        "run_id": run_id,
+        "started_at": now.isoformat(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "model": os.getenv("OPENAI_MODEL", "gpt-5-mini"),
+        "scanned": scanned_count,
+        "in_window": in_window_count,
+        "new_papers": len(new_papers),
+        "reported_papers": len(reported_ids),
+        "pruned": deleted_count,
+        "queries": query_stats,
+        "ingest_sec": round(ingest_sec, 3),
+        "report_sec": round(report_sec, 3),
+        "wall_sec": round(time.monotonic() - started, 3),
+        **metrics.totals(),
+        "calls": metrics.calls,
+    }
+    summary_name = f"arxiv_daily_report_{run_id}.json"
+    with open(summary_name, "w", encoding="utf-8") as f:
+        json.dump(run_summary, f, indent=2)
+    insert_run(conn, run_summary)
+    conn.commit()
     logging.info(
-        "Run finished. scanned=%s in_window=%s new=%s pruned=%s report=%s",
+        "Run finished. scanned=%s in_window=%s new=%s pruned=%s report=%s "
+        "llm_calls=%s prompt_tokens=%s cached_tokens=%s completion_tokens=%s",
         scanned_count,
         in_window_count,
         len(new_papers),
         deleted_count,
         report_name,
+        run_summary["llm_calls"],
+        run_summary["prompt_tokens"],
+        run_summary["cached_tokens"],
+        run_summary["completion_tokens"],
     )
 
     print(f"New unique papers in last 5 days: {len(new_papers)}")
@@ -204,5 +1474,20 @@ def main():
     print(f"Pruned old papers from DB: {deleted_count}")
 
 
+async def amain():
+    setup_logging()
+    conn = connect_db()
+    try:
+        await run_report(conn)
+    finally:
+        # Closing the last connection checkpoints the WAL back into arxiv.db,
+        # so whatever was committed survives even when the run fails midway.
+        conn.close()
+
+
+def main():
+    asyncio.run(amain())
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,138 @@
+"""Local stand-in for the arXiv export API (Atom feed).
+
+Synthetic mode serves a deterministic corpus of --papers papers, newest first,
+--per-hour apart; each query matches a stable pseudo-random --match-percent
+of it, so fan-out queries overlap the way real categories do.
+
+    python bench/fake_arxiv.py --port 8801 --papers 3000 --latency 0.5
+    ARXIV_API_URL=http://127.0.0.1:8801/api/query ARXIV_DELAY_SEC=0 python ArxivDailyReport.py
+
+--record DIR proxies to export.arxiv.org and saves each page; --replay DIR
+serves them back with published/updated dates shifted by the age of the
+recording, so replayed papers still fall inside the report window.
+"""
+import re
+import random
+import zlib
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlencode, urlparse
+from xml.sax.saxutils import escape
+
+from fakeserver import FakeHandler, build_arg_parser, request_key, serve
+
+WORDS = (
+    "superconducting vortex lattice Josephson junction topological insulator Majorana "
+    "zero mode quantum Hall edge state moire graphene twisted bilayer kagome flat band "
+    "Berry curvature spin liquid Kitaev magnon skyrmion nematic pairing symmetry "
+    "nodal gap Andreev reflection quantum dot charge density wave transport "
+    "thermoelectric hysteresis magnetoresistance Fermi surface heavy fermion "
+    "phonon polaron exciton spectroscopy tunneling microscopy measurement "
+    "theory model simulation we show that the and of in a with results indicate"
+).split()
+DATE_RE = re.compile(r"<(published|updated)>([^<]+)</\1>")
+
+
+def words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+class ArxivHandler(FakeHandler):
+    anchor = None
+    matches = {}
+    matches_lock = threading.Lock()
+
+    def error_response(self, status):
+        headers = {"Retry-After": str(int(self.options.retry_after))} if status in (429, 503) else {}
+        return "text/plain", f"fake arXiv error {status}", headers
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/api/query":
+            self.send_body(404, "text/plain", "not found")
+            return
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        key = request_key("arxiv", urlencode(sorted(params.items())))
+        self.respond(
+            key,
+            lambda: (200, "application/atom+xml; charset=utf-8", self.feed(params)),
+            f"{self.options.upstream}?{url.query}",
+            upstream_headers={"User-Agent": "arxiv-daily-report-bench"},
+            summary=params,
+        )
+
+    def matching_indices(self, query):
+        with self.matches_lock:
+            if query not in self.matches:
+                pct = self.options.match_percent
+                self.matches[query] = [
+                    i for i in range(self.options.papers)
+                    if zlib.crc32(f"{self.options.seed}:{query}:{i}".encode()) % 100 < pct
+                ]
+            return self.matches[query]
+
+    def entry(self, i):
+        opts = self.options
+        rng = random.Random(f"{opts.seed}:{i}")
+        published = self.anchor - timedelta(hours=i / opts.per_hour)
+        stamp = published.strftime("%Y-%m-%dT%H:%M:%SZ")
+        arxiv_id = f"{self.anchor:%y%m}.{i:05d}"
+        return (
+            "<entry>"
+            f"<id>http://arxiv.org/abs/{arxiv_id}v1</id>"
+            f"<updated>{stamp}</updated><published>{stamp}</published>"
+            f"<title>{escape(words(rng, opts.title_words).capitalize())}</title>"
+            f"<summary>{escape(words(rng, opts.abstract_words))}</summary>"
+            f"<author><name>Author {i}</name></author>"
+            f'<link href="http://arxiv.org/abs/{arxiv_id}v1" rel="alternate" type="text/html"/>'
+            '<arxiv:primary_category term="cond-mat.supr-con" scheme="http://arxiv.org/schemas/atom"/>'
+            "</entry>"
+        )
+
+    def feed(self, params):
+        indices = self.matching_indices(params.get("search_query", ""))
+        start = int(params.get("start", 0))
+        page = indices[start:start + int(params.get("max_results", 10))]
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" '
+            'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+            'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+            f"<title>arXiv Query: {escape(params.get('search_query', ''))}</title>"
+            f"<opensearch:totalResults>{len(indices)}</opensearch:totalResults>"
+            f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+            f"<opensearch:itemsPerPage>{len(page)}</opensearch:itemsPerPage>"
+            + "".join(self.entry(i) for i in page)
+            + "</feed>"
+        )
+
+    def replay_body(self, record):
+        if not self.options.shift_dates:
+            return record["body"]
+        shift = datetime.now(timezone.utc) - datetime.fromtimestamp(record["recorded_at"], timezone.utc)
+
+        def shifted(match):
+            when = datetime.fromisoformat(match.group(2).replace("Z", "+00:00")) + shift
+            return f"<{match.group(1)}>{when.strftime('%Y-%m-%dT%H:%M:%SZ')}</{match.group(1)}>"
+
+        return DATE_RE.sub(shifted, record["body"])
+
+
+def main():
+    parser = build_arg_parser(
+        "Fake arXiv export API", 8801, "https://export.arxiv.org/api/query", 503
+    )
+    parser.add_argument("--papers", type=int, default=2000, help="corpus size per query universe")
+    parser.add_argument("--per-hour", type=float, default=20.0, help="papers published per hour")
+    parser.add_argument("--match-percent", type=int, default=100, help="share of the corpus each query matches")
+    parser.add_argument("--title-words", type=int, default=10)
+    parser.add_argument("--abstract-words", type=int, default=180, help="abstract length (payload size)")
+    parser.add_argument("--no-shift-dates", dest="shift_dates", action="store_false",
+                        help="replay recorded dates verbatim")
+    options = parser.parse_args()
+    ArxivHandler.anchor = datetime.now(timezone.utc).replace(microsecond=0)
+    serve(ArxivHandler, options)
+
+
+if __name__ == "__main__":
+    main()
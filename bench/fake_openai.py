@@ -0,0 +1,272 @@
+"""Local stand-in for the OpenAI chat-completions, Files and Batch APIs.
+
+Synthetic mode answers json_schema requests with schema-valid output: one
+array item per "[n]" record in the user message, enums picked from the schema
+and --words words per string field. Usage reports prompt tokens at ~4
+characters each and, like the real API, counts a repeated system prompt as
+cached only once it reaches 1024 tokens.
+
+    python bench/fake_openai.py --port 8802 --latency 2 --jitter 1 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8802/v1 OPENAI_API_KEY=fake python ArxivDailyReport.py
+
+--record DIR proxies chat completions to the real API (the caller's
+Authorization header is forwarded) and --replay DIR serves them back. Batch
+jobs are always simulated locally; their lines are answered the same way as
+synchronous calls, including from recordings in replay mode.
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+
+from fakeserver import FakeHandler, build_arg_parser, request_key, serve
+
+WORDS = (
+    "the paper reports a measurement of superconducting vortex dynamics and "
+    "proposes a model for topological edge transport in moire devices with "
+    "evidence from tunneling spectroscopy and numerical simulation"
+).split()
+INDEX_RE = re.compile(r"^\[(\d+)\]", re.M)
+
+
+def fake_value(schema, indices, rng, n_words, index=None):
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: fake_value(prop, indices, rng, n_words, index)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {})
+        if "index" in items.get("properties", {}):
+            return [fake_value(items, indices, rng, n_words, i) for i in indices]
+        if "enum" in items:
+            return rng.sample(items["enum"], k=rng.randint(1, min(2, len(items["enum"]))))
+        return [fake_value(items, indices, rng, n_words) for _ in range(rng.randint(1, 3))]
+    if kind == "integer":
+        return index if index is not None else rng.randint(1, 10)
+    if kind == "number":
+        return rng.random()
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+class OpenAIHandler(FakeHandler):
+    files = {}
+    batches = {}
+    seen_prefixes = set()
+    state_lock = threading.RLock()
+
+    def error_response(self, status):
+        headers = {}
+        if status == 429:
+            headers["retry-after-ms"] = str(int(self.options.retry_after * 1000))
+        body = {"error": {"message": f"fake error {status}", "type": "fake_error", "code": None}}
+        return "application/json", json.dumps(body), headers
+
+    def route(self):
+        path = self.path.split("?")[0]
+        return path[3:] if path.startswith("/v1/") else path
+
+    def do_POST(self):
+        path = self.route()
+        if path == "/chat/completions":
+            self.chat_completions()
+        elif path == "/files":
+            self.create_file()
+        elif path == "/batches":
+            self.create_batch()
+        elif path.startswith("/batches/") and path.endswith("/cancel"):
+            self.cancel_batch(path.split("/")[2])
+        else:
+            self.send_json(404, {"error": {"message": f"unknown endpoint {path}"}})
+
+    def do_GET(self):
+        path = self.route()
+        if path.startswith("/files/") and path.endswith("/content"):
+            content = self.files.get(path.split("/")[2])
+            if content is None:
+                self.send_json(404, {"error": {"message": "no such file"}})
+            else:
+                self.send_body(200, "application/octet-stream", content)
+        elif path.startswith("/batches/"):
+            batch = self.refresh_batch(path.split("/")[2])
+            if batch is None:
+                self.send_json(404, {"error": {"message": "no such batch"}})
+            else:
+                self.send_json(200, batch)
+        else:
+            self.send_json(404, {"error": {"message": f"unknown endpoint {path}"}})
+
+    def chat_completions(self):
+        raw = self.read_body()
+        body = json.loads(raw)
+        headers = {"Content-Type": "application/json"}
+        if self.headers.get("Authorization"):
+            headers["Authorization"] = self.headers["Authorization"]
+        self.respond(
+            self.chat_key(body),
+            lambda: (200, "application/json", json.dumps(self.completion(body))),
+            f"{self.options.upstream}/chat/completions",
+            data=raw,
+            upstream_headers=headers,
+            summary={"model": body.get("model"), "chars": len(raw)},
+        )
+
+    def chat_key(self, body):
+        return request_key("chat", json.dumps(body, sort_keys=True))
+
+    def completion(self, body):
+        opts = self.options
+        messages = body.get("messages", [])
+        user = messages[-1]["content"] if messages else ""
+        rng = random.Random(f"{opts.seed}:{self.chat_key(body)}")
+        schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema")
+        indices = [int(i) for i in INDEX_RE.findall(user)]
+        if schema:
+            content = json.dumps(fake_value(schema, indices, rng, opts.words))
+        else:
+            content = " ".join(rng.choice(WORDS) for _ in range(opts.words))
+
+        prefix = "".join(m["content"] for m in messages[:-1])
+        prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self.state_lock:
+            cached = prefix_hash in self.seen_prefixes
+            self.seen_prefixes.add(prefix_hash)
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4 + 1
+        # Providers cache in 128-token steps once the prefix reaches 1024 tokens.
+        cached_tokens = (len(prefix) // 4) // 128 * 128 if cached and len(prefix) >= 4096 else 0
+        completion_tokens = len(content) // 4 + 1
+        return {
+            "id": f"chatcmpl-fake-{rng.getrandbits(48):012x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": None},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def answer_line(self, item):
+        """Answer one Batch API input line like a synchronous call would."""
+        body = item["body"]
+        if self.options.replay:
+            record = self.recordings.load(self.chat_key(body))
+            if record is None:
+                return {"status_code": 404, "body": {"error": {"message": "no recording"}}}
+            return {"status_code": record["status"], "body": json.loads(record["body"])}
+        if self.options.error_rate and self.random() < self.options.error_rate:
+            return {"status_code": 500, "body": {"error": {"message": "fake batch line error"}}}
+        return {"status_code": 200, "body": self.completion(body)}
+
+    def new_id(self, prefix):
+        with self.rng_lock:
+            return f"{prefix}-fake-{self.rng.getrandbits(48):012x}"
+
+    def create_file(self):
+        raw = self.read_body()
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+        message = BytesParser(policy=HTTP).parsebytes(header + raw)
+        fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        if "file" not in fields:
+            self.send_json(400, {"error": {"message": "multipart field 'file' is required"}})
+            return
+        content = fields["file"].get_payload(decode=True)
+        file_id = self.new_id("file")
+        with self.state_lock:
+            self.files[file_id] = content
+        self.send_json(200, {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": fields["file"].get_filename() or "upload.jsonl",
+            "purpose": fields["purpose"].get_payload(decode=True).decode() if "purpose" in fields else "batch",
+            "status": "processed",
+        })
+
+    def create_batch(self):
+        if self.options.record:
+            self.send_json(501, {"error": {"message": "batch endpoints are not recorded; use synthetic or replay"}})
+            return
+        body = json.loads(self.read_body())
+        if body.get("input_file_id") not in self.files:
+            self.send_json(400, {"error": {"message": "unknown input_file_id"}})
+            return
+        total = sum(1 for line in self.files[body["input_file_id"]].splitlines() if line.strip())
+        batch = {
+            "id": self.new_id("batch"),
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": total, "completed": 0, "failed": 0},
+        }
+        with self.state_lock:
+            self.batches[batch["id"]] = batch
+        self.send_json(200, batch)
+
+    def refresh_batch(self, batch_id):
+        with self.state_lock:
+            batch = self.batches.get(batch_id)
+            if batch is None or batch["status"] != "in_progress":
+                return batch
+            if time.time() - batch["created_at"] < self.options.batch_delay:
+                return batch
+            lines = []
+            counts = batch["request_counts"]
+            for line in self.files[batch["input_file_id"]].splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = self.answer_line(item)
+                counts["completed" if response["status_code"] == 200 else "failed"] += 1
+                lines.append(json.dumps({"id": f"req-{item['custom_id'][:12]}", "custom_id": item["custom_id"],
+                                         "response": response, "error": None}))
+            output_id = f"file-{batch_id}-output"
+            self.files[output_id] = ("\n".join(lines) + "\n").encode("utf-8")
+            batch.update(status="completed", output_file_id=output_id, completed_at=int(time.time()))
+            return batch
+
+    def cancel_batch(self, batch_id):
+        with self.state_lock:
+            batch = self.batches.get(batch_id)
+            if batch is not None and batch["status"] == "in_progress":
+                batch["status"] = "cancelled"
+        if batch is None:
+            self.send_json(404, {"error": {"message": "no such batch"}})
+        else:
+            self.send_json(200, batch)
+
+
+def main():
+    parser = build_arg_parser("Fake OpenAI API", 8802, "https://api.openai.com/v1", 429)
+    parser.add_argument("--words", type=int, default=40, help="words per generated string field (payload size)")
+    parser.add_argument("--batch-delay", type=float, default=5.0, help="seconds before a batch completes")
+    serve(OpenAIHandler, parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Shared plumbing for the local arXiv / OpenAI stand-ins used for benchmarking.
+
+Both servers add configurable latency and error injection, and can either
+proxy to the real upstream while recording every response to a directory
+(--record) or serve only those recordings (--replay), so a benchmark can be
+re-run offline against byte-identical responses.
+"""
+import json
+import random
+import hashlib
+import logging
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+def build_arg_parser(description, default_port, default_upstream, default_error_status):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=default_error_status)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429/503, seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for generated content and injected errors")
+    parser.add_argument("--upstream", default=default_upstream, help="real API base URL used by --record")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="DIR", help="proxy to --upstream and save every response")
+    mode.add_argument("--replay", metavar="DIR", help="serve only responses saved by --record")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser
+
+
+def request_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Recordings:
+    """One JSON file per recorded response, named by its request key."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def load(self, key):
+        path = self.directory / f"{key}.json"
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, key, status, content_type, body, request_summary):
+        record = {
+            "recorded_at": time.time(),
+            "request": request_summary,
+            "status": status,
+            "content_type": content_type,
+            "body": body.decode("utf-8"),
+        }
+        with open(self.directory / f"{key}.json", "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=1)
+
+
+def fetch_upstream(url, data=None, headers=None, timeout=120):
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return resp.status, resp.headers.get("Content-Type", ""), resp.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers.get("Content-Type", ""), exc.read()
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Base handler: subclasses route requests and call respond()."""
+
+    protocol_version = "HTTP/1.1"
+    options = None
+    recordings = None
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        logging.debug("%s %s", self.address_string(), fmt % args)
+
+    def random(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_body(self, status, content_type, body, headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload, headers=None):
+        self.send_body(status, "application/json", json.dumps(payload), headers)
+
+    def error_response(self, status):
+        """Return (content_type, body, headers) for an injected failure."""
+        raise NotImplementedError
+
+    def simulate_network(self):
+        """Apply latency and maybe inject a failure; returns True if one was sent."""
+        opts = self.options
+        delay = opts.latency + (opts.jitter * self.random() if opts.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if opts.error_rate and self.random() < opts.error_rate:
+            content_type, body, headers = self.error_response(opts.error_status)
+            self.send_body(opts.error_status, content_type, body, headers)
+            return True
+        return False
+
+    def respond(self, key, generate, upstream_url, data=None, upstream_headers=None, summary=None):
+        """Serve one request from the recordings, the upstream or the local generator.
+
+        generate() returns (status, content_type, body) for the synthetic case.
+        """
+        if self.simulate_network():
+            return
+        opts = self.options
+        if opts.replay:
+            record = self.recordings.load(key)
+            if record is None:
+                logging.warning("No recording for %s", summary)
+                self.send_json(404, {"error": {"message": f"no recording for request {key}"}})
+                return
+            self.send_body(record["status"], record["content_type"], self.replay_body(record))
+            return
+        if opts.record:
+            status, content_type, body = fetch_upstream(upstream_url, data, upstream_headers)
+            if status == 200:
+                self.recordings.save(key, status, content_type, body, summary)
+            self.send_body(status, content_type, body)
+            return
+        status, content_type, body = generate()
+        self.send_body(status, content_type, body)
+
+    def replay_body(self, record):
+        return record["body"]
+
+
+def serve(handler_cls, options):
+    logging.basicConfig(
+        level=logging.DEBUG if options.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    handler_cls.options = options
+    handler_cls.rng = random.Random(options.seed)
+    if options.record or options.replay:
+        handler_cls.recordings = Recordings(options.record or options.replay)
+    server = ThreadingHTTPServer((options.host, options.port), handler_cls)
+    mode = "record" if options.record else "replay" if options.replay else "synthetic"
+    logging.info("%s listening on http://%s:%s (%s)", handler_cls.__name__, options.host, options.port, mode)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
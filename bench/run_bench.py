@@ -0,0 +1,113 @@
+"""Run ArxivDailyReport.py against the local fakes and report throughput.
+
+    python bench/run_bench.py --runs 3 --papers 2000 --openai-latency 1.5
+    python bench/run_bench.py --arxiv-replay fixtures/arxiv --openai-replay fixtures/openai
+
+Each run starts from an empty arxiv.db in a scratch directory (--warm reuses
+one directory so later runs hit the caches) and prints ingest and summarize
+throughput from the run summary JSON the report writes.
+"""
+import os
+import sys
+import json
+import glob
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPORT_SCRIPT = BENCH_DIR.parent / "ArxivDailyReport.py"
+
+
+def start_server(script, port, args):
+    proc = subprocess.Popen([sys.executable, str(BENCH_DIR / script), "--port", str(port), *args])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{script} did not start on port {port}")
+
+
+def run_once(work_dir, env):
+    before = set(glob.glob(os.path.join(work_dir, "arxiv_daily_report_*.json")))
+    subprocess.run([sys.executable, str(REPORT_SCRIPT)], cwd=work_dir, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    (summary_path,) = set(glob.glob(os.path.join(work_dir, "arxiv_daily_report_*.json"))) - before
+    with open(summary_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warm", action="store_true", help="reuse one arxiv.db across runs")
+    parser.add_argument("--arxiv-port", type=int, default=8801)
+    parser.add_argument("--openai-port", type=int, default=8802)
+    parser.add_argument("--papers", type=int, default=2000)
+    parser.add_argument("--per-hour", type=float, default=20.0)
+    parser.add_argument("--abstract-words", type=int, default=180)
+    parser.add_argument("--arxiv-latency", type=float, default=0.3)
+    parser.add_argument("--arxiv-delay", type=float, default=0.0, help="ARXIV_DELAY_SEC for the report")
+    parser.add_argument("--openai-latency", type=float, default=1.0)
+    parser.add_argument("--openai-jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--arxiv-replay", metavar="DIR")
+    parser.add_argument("--openai-replay", metavar="DIR")
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args()
+
+    arxiv_args = ["--latency", str(options.arxiv_latency), "--error-rate", str(options.error_rate),
+                  "--seed", str(options.seed)]
+    arxiv_args += (["--replay", options.arxiv_replay] if options.arxiv_replay else
+                   ["--papers", str(options.papers), "--per-hour", str(options.per_hour),
+                    "--abstract-words", str(options.abstract_words)])
+    openai_args = ["--latency", str(options.openai_latency), "--jitter", str(options.openai_jitter),
+                   "--error-rate", str(options.error_rate), "--seed", str(options.seed),
+                   "--words", str(options.words), "--batch-delay", "1"]
+    if options.openai_replay:
+        openai_args += ["--replay", options.openai_replay]
+
+    env = {
+        **os.environ,
+        "ARXIV_API_URL": f"http://127.0.0.1:{options.arxiv_port}/api/query",
+        "ARXIV_DELAY_SEC": str(options.arxiv_delay),
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{options.openai_port}/v1",
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BATCH_POLL_SEC": "0.5",
+    }
+    servers = [
+        start_server("fake_arxiv.py", options.arxiv_port, arxiv_args),
+        start_server("fake_openai.py", options.openai_port, openai_args),
+    ]
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            print("run  scanned  new  reported  ingest_s  papers/s  report_s  papers/s  llm_calls  wall_s")
+            for run in range(1, options.runs + 1):
+                work_dir = scratch if options.warm else tempfile.mkdtemp(dir=scratch)
+                s = run_once(work_dir, env)
+                print(
+                    f"{run:>3}  {s['scanned']:>7}  {s['new_papers']:>3}  {s['reported_papers']:>8}  "
+                    f"{s['ingest_sec']:>8.2f}  {rate(s['in_window'], s['ingest_sec']):>8.1f}  "
+                    f"{s['report_sec']:>8.2f}  {rate(s['reported_papers'], s['report_sec']):>8.1f}  "
+                    f"{s['llm_calls']:>9}  {s['wall_sec']:>6.2f}"
+                )
+    finally:
+        for proc in servers:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
+import json
 import sqlite3
 from datetime import datetime, timezone
 
 DB_NAME = "arxiv.db"
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
+def connect_db(db_name=DB_NAME):
+    conn = sqlite3.connect(db_name)
+    # WAL + NORMAL sync is durable across app crashes and avoids an fsync per commit.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-16000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def _columns(cur, table):
+    return {row[1] for row in cur.execute(f"PRAGMA table_info({table})").fetchall()}
 
+def _add_column(cur, table, column, decl):
+    # Guarded so databases left half-migrated by the old autocommit migrator recover.
+    if column not in _columns(cur, table):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def _migrate_papers(cur):
     cur.execute("""
     CREATE TABLE IF NOT EXISTS papers (
         arxiv_id TEXT PRIMARY KEY,
@@ -16,49 +31,330 @@ def init_db():
         created_at TEXT
     )
     """)
-
     # Backward-compatible migration for existing DB files created without summary.
-    cur.execute("PRAGMA table_info(papers)")
-    columns = [row[1] for row in cur.fetchall()]
-    if "summary" not in columns:
-        cur.execute("ALTER TABLE papers ADD COLUMN summary TEXT")
+    _add_column(cur, "papers", "summary", "TEXT")
 
-    conn.commit()
-    conn.close()
+def _migrate_paper_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_papers_published_utc ON papers (published_utc)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_papers_created_at ON papers (created_at)")
 
-def insert_if_new(arxiv_id, title, summary, published):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
+def _migrate_meta(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+def _migrate_llm_cache(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT,
+        response TEXT,
+        created_at TEXT,
+        last_used_at TEXT
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache (created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used_at ON llm_cache (last_used_at)")
+
+def _migrate_paper_summaries(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS paper_summaries (
+        arxiv_id TEXT,
+        summary_hash TEXT,
+        summary TEXT,
+        tags TEXT,
+        justification TEXT,
+        model TEXT,
+        created_at TEXT,
+        PRIMARY KEY (arxiv_id, summary_hash)
+    )
+    """)
 
-    cur.execute("SELECT arxiv_id FROM papers WHERE arxiv_id = ?", (arxiv_id,))
-    exists = cur.fetchone()
+def _migrate_summary_priority(cur):
+    _add_column(cur, "paper_summaries", "priority", "TEXT")
+
+def _migrate_runs(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        started_at TEXT,
+        finished_at TEXT,
+        model TEXT,
+        scanned INTEGER,
+        new_papers INTEGER,
+        llm_calls INTEGER,
+        llm_failed_calls INTEGER,
+        llm_attempts INTEGER,
+        prompt_tokens INTEGER,
+        cached_tokens INTEGER,
+        completion_tokens INTEGER,
+        llm_latency_sec REAL,
+        wall_sec REAL,
+        summary_json TEXT
+    )
+    """)
 
-    if exists:
-        conn.close()
-        return False
+def _migrate_paper_status(cur):
+    # Per-paper progress: fetched -> summarized -> reported. Rows that
+    # predate tracking were already reported by the run that stored them.
+    _add_column(cur, "papers", "url", "TEXT")
+    _add_column(cur, "papers", "status", "TEXT DEFAULT 'reported'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_papers_status ON papers (status)")
 
+def _migrate_pending_papers(cur):
+    # Unreported papers are staged in pending_papers and only promoted to
+    # papers once a report containing them is on disk, so papers holds
+    # exactly the papers that were reported.
     cur.execute("""
-        INSERT INTO papers (arxiv_id, title, summary, published_utc, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (
-        arxiv_id,
-        title,
-        summary,
-        published,
-        datetime.now(timezone.utc).isoformat()
-    ))
+    CREATE TABLE IF NOT EXISTS pending_papers (
+        arxiv_id TEXT PRIMARY KEY,
+        title TEXT,
+        summary TEXT,
+        published_utc TEXT,
+        url TEXT,
+        status TEXT,
+        created_at TEXT
+    )
+    """)
+    if "status" in _columns(cur, "papers"):
+        cur.execute("""
+            INSERT OR IGNORE INTO pending_papers
+                (arxiv_id, title, summary, published_utc, url, status, created_at)
+            SELECT arxiv_id, title, summary, published_utc, url, status, created_at
+            FROM papers WHERE status != 'reported'
+        """)
+        cur.execute("DELETE FROM papers WHERE status != 'reported'")
+        cur.execute("DROP INDEX IF EXISTS idx_papers_status")
+        cur.execute("ALTER TABLE papers DROP COLUMN status")
 
+# Step n brings a database from user_version n-1 to n; append, never reorder.
+MIGRATIONS = (
+    _migrate_papers,
+    _migrate_paper_indexes,
+    _migrate_meta,
+    _migrate_llm_cache,
+    _migrate_paper_summaries,
+    _migrate_summary_priority,
+    _migrate_runs,
+    _migrate_paper_status,
+    _migrate_pending_papers,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def init_db(conn):
+    # Each step runs in one explicit transaction together with its
+    # user_version bump (SQLite DDL is transactional), so an interrupted
+    # migration rolls back and is simply retried by the next run.
     conn.commit()
-    conn.close()
-    return True
+    cur = conn.cursor()
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+
+    for target, step in enumerate(MIGRATIONS, start=1):
+        if version >= target:
+            continue
+        cur.execute("BEGIN")
+        try:
+            step(cur)
+            cur.execute(f"PRAGMA user_version = {target}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+def stage_new_papers(conn, papers):
+    """Stage papers seen neither in papers nor pending_papers; return the new arxiv_ids."""
+    # No commit here: callers group a whole run's inserts into one transaction.
+    created_at = datetime.now(timezone.utc).isoformat()
+    rows = [
+        (p["arxiv_id"], p["title"], p["summary"], p["published_utc"], p["url"], created_at)
+        for p in papers
+    ]
+
+    new_ids = set()
+    # Stay well below SQLite's bound-parameter limit (6 params per row).
+    for i in range(0, len(rows), 500):
+        batch = rows[i:i + 500]
+        placeholders = ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(batch))
+        cur = conn.execute(f"""
+            WITH incoming (arxiv_id, title, summary, published_utc, url, created_at) AS (
+                VALUES {placeholders}
+            )
+            INSERT INTO pending_papers
+                (arxiv_id, title, summary, published_utc, url, status, created_at)
+            SELECT arxiv_id, title, summary, published_utc, url, 'fetched', created_at
+            FROM incoming
+            WHERE NOT EXISTS (SELECT 1 FROM papers WHERE papers.arxiv_id = incoming.arxiv_id)
+            ON CONFLICT(arxiv_id) DO NOTHING
+            RETURNING arxiv_id
+        """, [value for row in batch for value in row])
+        new_ids.update(row[0] for row in cur.fetchall())
+
+    return new_ids
+
+def get_pending_papers(conn):
+    """Papers staged by this or an earlier run that have not made it into a report yet."""
+    rows = conn.execute("""
+        SELECT arxiv_id, title, summary, published_utc, url FROM pending_papers
+        ORDER BY published_utc DESC
+    """).fetchall()
+    return [
+        {
+            "arxiv_id": arxiv_id,
+            "title": title,
+            "summary": summary or "",
+            "published_utc": published_utc,
+            "url": url or f"https://arxiv.org/abs/{arxiv_id}",
+        }
+        for arxiv_id, title, summary, published_utc, url in rows
+    ]
+
+def set_pending_status(conn, arxiv_ids, status):
+    conn.executemany(
+        "UPDATE pending_papers SET status = ? WHERE arxiv_id = ?",
+        [(status, arxiv_id) for arxiv_id in arxiv_ids],
+    )
+
+def promote_papers(conn, arxiv_ids):
+    """Move reported papers from pending_papers into papers in one transaction."""
+    params = [(arxiv_id,) for arxiv_id in arxiv_ids]
+    with conn:
+        conn.executemany("""
+            INSERT OR IGNORE INTO papers (arxiv_id, title, summary, published_utc, url, created_at)
+            SELECT arxiv_id, title, summary, published_utc, url, created_at
+            FROM pending_papers WHERE arxiv_id = ?
+        """, params)
+        conn.executemany("DELETE FROM pending_papers WHERE arxiv_id = ?", params)
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(conn, key, value):
+    conn.execute("""
+        INSERT INTO meta (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (key, value))
 
-def prune_old_papers(cutoff_iso):
-    conn = sqlite3.connect(DB_NAME)
+def get_cached_response(conn, cache_key, used_at):
+    row = conn.execute(
+        "SELECT response FROM llm_cache WHERE cache_key = ?", (cache_key,)
+    ).fetchone()
+    if row is None:
+        return None
+    conn.execute(
+        "UPDATE llm_cache SET last_used_at = ? WHERE cache_key = ?", (used_at, cache_key)
+    )
+    return row[0]
+
+def put_cached_response(conn, cache_key, model, response, created_at):
+    conn.execute("""
+        INSERT INTO llm_cache (cache_key, model, response, created_at, last_used_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(cache_key) DO UPDATE SET
+            response = excluded.response,
+            created_at = excluded.created_at,
+            last_used_at = excluded.last_used_at
+    """, (cache_key, model, response, created_at, created_at))
+
+def evict_llm_cache(conn, cutoff_iso, max_entries):
+    """Drop entries created before cutoff_iso, then keep the max_entries most recently used."""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff_iso,))
+    deleted_rows = cur.rowcount
+    cur.execute("""
+        DELETE FROM llm_cache WHERE cache_key NOT IN (
+            SELECT cache_key FROM llm_cache ORDER BY last_used_at DESC LIMIT ?
+        )
+    """, (max_entries,))
+    return deleted_rows + cur.rowcount
+
+def get_paper_summaries(conn, keys):
+    """Return {arxiv_id: record} for the (arxiv_id, summary_hash) pairs already summarized."""
+    found = {}
+    for arxiv_id, summary_hash in keys:
+        row = conn.execute("""
+            SELECT summary, tags, justification, priority FROM paper_summaries
+            WHERE arxiv_id = ? AND summary_hash = ?
+        """, (arxiv_id, summary_hash)).fetchone()
+        if row:
+            found[arxiv_id] = {
+                "summary": row[0],
+                "tags": json.loads(row[1]),
+                "justification": row[2],
+                "priority": row[3],
+            }
+    return found
+
+def put_paper_summaries(conn, rows, model, created_at):
+    """rows: iterable of (arxiv_id, summary_hash, record) tuples."""
+    conn.executemany("""
+        INSERT INTO paper_summaries
+            (arxiv_id, summary_hash, summary, tags, justification, priority, model, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(arxiv_id, summary_hash) DO UPDATE SET
+            summary = excluded.summary,
+            tags = excluded.tags,
+            justification = excluded.justification,
+            priority = excluded.priority,
+            model = excluded.model,
+            created_at = excluded.created_at
+    """, [
+        (
+            arxiv_id,
+            summary_hash,
+            record["summary"],
+            json.dumps(record["tags"]),
+            record["justification"],
+            record.get("priority"),
+            model,
+            created_at,
+        )
+        for arxiv_id, summary_hash, record in rows
+    ])
+
+RUN_COLUMNS = (
+    "run_id",
+    "started_at",
+    "finished_at",
+    "model",
+    "scanned",
+    "new_papers",
+    "llm_calls",
+    "llm_failed_calls",
+    "llm_attempts",
+    "prompt_tokens",
+    "cached_tokens",
+    "completion_tokens",
+    "llm_latency_sec",
+    "wall_sec",
+)
+
+def insert_run(conn, run):
+    """Record a run summary; run is the dict written to the JSON summary file."""
+    columns = RUN_COLUMNS + ("summary_json",)
+    values = [run.get(c) for c in RUN_COLUMNS] + [json.dumps(run)]
+    conn.execute(f"""
+        INSERT OR REPLACE INTO runs ({", ".join(columns)})
+        VALUES ({", ".join("?" * len(columns))})
+    """, values)
+
+def prune_old_papers(conn, cutoff_iso):
     cur = conn.cursor()
 
     cur.execute("DELETE FROM papers WHERE published_utc < ?", (cutoff_iso,))
     deleted_rows = cur.rowcount
+    cur.execute("DELETE FROM pending_papers WHERE published_utc < ?", (cutoff_iso,))
+    deleted_rows += cur.rowcount
+    # Cached summaries only matter while their paper is still tracked; this
+    # also drops rows keyed under an older model or tag set.
+    cur.execute("""
+        DELETE FROM paper_summaries
+        WHERE arxiv_id NOT IN (SELECT arxiv_id FROM papers)
+          AND arxiv_id NOT IN (SELECT arxiv_id FROM pending_papers)
+    """)
 
     conn.commit()
-    conn.close()
     return deleted_rows
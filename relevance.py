@@ -0,0 +1,67 @@
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "are", "from", "which", "can",
+    "our", "these", "its", "has", "have", "been", "also", "using", "show", "such",
+    "into", "than", "not", "their", "both", "between", "based", "here", "while",
+    "via", "one", "two", "new", "well", "may", "was", "were", "who", "all",
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 2 and t not in STOPWORDS]
+
+
+def _tfidf(tokens, idf):
+    # Sublinear tf keeps one repeated word from dominating an abstract.
+    counts = Counter(tokens)
+    vec = {t: (1 + math.log(c)) * idf.get(t, 0.0) for t, c in counts.items()}
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {t: v / norm for t, v in vec.items()} if norm else {}
+
+
+def score_papers(papers, seeds):
+    """Score each paper's title + abstract against per-tag seed descriptions.
+
+    Returns {arxiv_id: (best_score, best_tag)} using TF-IDF cosine similarity,
+    with IDF fitted on the papers and seeds together.
+    """
+    paper_tokens = {p["arxiv_id"]: tokenize(f"{p['title']} {p['summary']}") for p in papers}
+    seed_tokens = {tag: tokenize(text) for tag, text in seeds.items()}
+
+    docs = list(paper_tokens.values()) + list(seed_tokens.values())
+    df = Counter(t for tokens in docs for t in set(tokens))
+    idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1 for t, n in df.items()}
+
+    seed_vecs = {tag: _tfidf(tokens, idf) for tag, tokens in seed_tokens.items()}
+    scores = {}
+    for arxiv_id, tokens in paper_tokens.items():
+        vec = _tfidf(tokens, idf)
+        best_score, best_tag = 0.0, None
+        for tag, seed_vec in seed_vecs.items():
+            score = sum(w * seed_vec[t] for t, w in vec.items() if t in seed_vec)
+            if score > best_score:
+                best_score, best_tag = score, tag
+        scores[arxiv_id] = (best_score, best_tag)
+    return scores
+
+
+def build_keyword_matcher(keywords_by_tag):
+    """Compile all tag keyword patterns into one regex with a named group per tag.
+
+    Patterns must only use non-capturing groups so match.lastgroup names the tag.
+    """
+    alternatives = [
+        f"(?P<{tag}>{'|'.join(patterns)})"
+        for tag, patterns in keywords_by_tag.items()
+        if patterns
+    ]
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+def keyword_hits(matcher, text):
+    """Return a Counter of {tag: number of keyword matches} in text."""
+    return Counter(match.lastgroup for match in matcher.finditer(text))